@@ -1,41 +1,281 @@
 from __future__ import annotations
 
-import argparse
+import functools
 import sys
-import subprocess
 import re
 import os
+from collections.abc import Callable, Sequence
+
+# typing is slow to import and only needed by type checkers, which treat
+# TYPE_CHECKING as true.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+
+# The following patterns analyze user-supplied patterns. They are kept as
+# strings, so they are only compiled (and cached by re) when needed.
+
+# Anchored patterns made of plain words only, e.g. ^(main|master)$ or ^main$.
+# Words can also contain the separators usual in branch names: / - and \.
+# \Z, unlike $, does not match before a trailing newline in the pattern.
+LITERAL_PATTERN = r'^\^(?:\(((?:[\w/|-]|\\\.)+)\)|((?:[\w/-]|\\\.)+))\$\Z'
+# Patterns starting with an alternation of plain words followed by a slash,
+# e.g. ^(feature|bugfix)/..., without other alternations or inline flags. The
+# slash must not be quantified, as in ^(feature|bugfix)/?... The lookahead
+# also covers what follows newlines in the pattern.
+PREFIX_PATTERN = r'^\^\(([\w|]+)\)/(?![?*+{])(?![\s\S]*(?:\||\(\?))'
+# Constructs that change meaning once patterns are joined in an alternation:
+# numbered backreferences, e.g. \1, and conditionals, e.g. (?(1)...), would
+# point at the wrong group and inline global flags, e.g. (?i), would apply to
+# all patterns (Python < 3.11) or fail to compile (Python >= 3.11).
+UNJOINABLE_PATTERN = r'\\[1-9]|\(\?\(|\(\?[aiLmsux]+\)'
+
+
+class _LiteralPattern:
+    """
+    Stand-in for a compiled regular expression that only matches a fixed set
+    of words. Matching is a set lookup instead of running the regex engine.
+    """
+
+    def __init__(self, pattern: str, literals: frozenset[str]) -> None:
+        self.pattern = pattern
+        self.literals = literals
+
+    def match(self, string: str) -> bool:
+        return string in self.literals
+
+
+class _PrefixPattern:
+    """
+    Stand-in for a compiled regular expression that requires the string to
+    start with one of a set of prefixes. Strings without any of the prefixes
+    are rejected without running the regex engine.
+    """
+
+    def __init__(self, pattern: str, prefixes: tuple[str, ...],
+                 regex_match: Callable[[str], object]) -> None:
+        self.pattern = pattern
+        self.prefixes = prefixes
+        self.regex_match = regex_match
+
+    def match(self, string: str) -> object:
+        if not string.startswith(self.prefixes):
+            return None
+        return self.regex_match(string)
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_pattern(pattern: str) -> re.Pattern[str] | _LiteralPattern | _PrefixPattern:
+    """
+    Compile a pattern for matching branch names. Anchored alternations of
+    plain words, which can also contain /, - and escaped dots, are turned into
+    a set lookup. Patterns starting with an alternation of words and a slash
+    are guarded by a prefix check. Other patterns are compiled as regular
+    expressions. All kinds expose .match() and .pattern. Results are cached,
+    so repeated patterns are only compiled once.
+
+    Args:
+      pattern: The regular expression to compile.
+
+    Returns:
+      An object with a match() method, truthy on match.
+    """
+    literal = re.match(LITERAL_PATTERN, pattern)
+    if literal:
+        words = (literal.group(1) or literal.group(2)).replace('\\.', '.').split('|')
+        # $ also matches before a trailing newline
+        return _LiteralPattern(pattern, frozenset(words + [f'{word}\n' for word in words]))
+    prefix = re.match(PREFIX_PATTERN, pattern)
+    if prefix:
+        prefixes = tuple(f'{word}/' for word in prefix.group(1).split('|'))
+        return _PrefixPattern(pattern, prefixes, re.compile(pattern).match)
+    return re.compile(pattern)
+
+
+def _combine_patterns(
+        patterns: Sequence[re.Pattern[str] | _LiteralPattern | _PrefixPattern],
+) -> list[Callable[[str], object]]:
+    """
+    Combine compiled patterns into as few matchers as possible: all literal
+    patterns are merged into a single set lookup, and all regular expressions
+    into a single alternation. Prefix patterns are kept apart, so they can
+    reject strings early.
+
+    Args:
+      patterns: The patterns to combine, as returned by _compile_pattern().
+
+    Returns:
+      A list of match functions, truthy on match when any of the patterns
+      would.
+    """
+    literals = [p for p in patterns if isinstance(p, _LiteralPattern)]
+    prefixed = [p for p in patterns if isinstance(p, _PrefixPattern)]
+    regexes = [p.pattern for p in patterns
+               if not isinstance(p, (_LiteralPattern, _PrefixPattern))]
+
+    matchers: list[Callable[[str], object]] = []
+    if literals:
+        matchers.append(frozenset(word for p in literals for word in p.literals).__contains__)
+    matchers.extend(p.match for p in prefixed)
+    # Patterns that would change meaning once joined are kept separate, and
+    # so are all patterns when they cannot be joined, e.g. because of
+    # duplicate group names.
+    joinable: list[str] = []
+    separate: list[str] = []
+    for p in regexes:
+        (separate if re.search(UNJOINABLE_PATTERN, p) else joinable).append(p)
+    if len(joinable) > 1:
+        try:
+            matchers.append(re.compile('|'.join(f'(?:{p})' for p in joinable)).match)
+            joinable = []
+        except re.error:
+            pass
+    matchers.extend(re.compile(p).match for p in joinable + separate)
+    return matchers
+
+
+def _compile_default_patterns(patterns: Sequence[str]) -> list[Callable[[str], object]]:
+    """
+    Compile the default patterns into matchers. This runs at every import, so
+    the patterns are analyzed with string operations only. Anchored
+    alternations of ASCII words are merged into a single set lookup, other
+    patterns are joined without their anchors into a single regular
+    expression, matched with fullmatch() and compiled with re.ASCII.
+
+    Args:
+      patterns: The patterns to compile. They must be of the form ^...$, with
+      no top-level alternation, and only use ASCII character classes.
+
+    Returns:
+      A list of match functions, truthy on match when any of the patterns
+      would.
+    """
+    literals: list[str] = []
+    regexes: list[str] = []
+    for pattern in patterns:
+        body = pattern[1:-1]
+        if body.startswith('(') and body.endswith(')'):
+            words = body[1:-1].split('|')
+        else:
+            words = body.split('|')
+        if all(word.isascii() and word.isalnum() for word in words):
+            literals.extend(words)
+            literals.extend(f'{word}\n' for word in words)
+        else:
+            regexes.append(body)
+
+    matchers: list[Callable[[str], object]] = []
+    if literals:
+        matchers.append(frozenset(literals).__contains__)
+    if regexes:
+        # \n? stands for $, which also matches before a trailing newline
+        alternation = '|'.join(f'(?:{p})' for p in regexes)
+        combined = re.compile(f'(?:{alternation})\n?', re.ASCII)
+        matchers.append(combined.fullmatch)
+    return matchers
+
 
 # Default patterns are for conventional branches. See:
 # https://conventional-branch.github.io/
 DEFAULT_ALLOWED_PATTERNS = [
     '^(feature|bugfix|hotfix|release|chore)/[a-z0-9/.-]*[a-z0-9]$',
-    '^(main|master|develop)$'
+    '^(main|master|develop)$',
 ]
-DEFAULT_DENIED_PATTERNS = []
+DEFAULT_DENIED_PATTERNS: list[str] = []
+DEFAULT_ALLOWED_MATCHERS = _compile_default_patterns(DEFAULT_ALLOWED_PATTERNS)
+DEFAULT_DENIED_MATCHERS = _compile_default_patterns(DEFAULT_DENIED_PATTERNS)
+
+# Prefix of the content of HEAD when it points to a local branch
+HEAD_BRANCH_PREFIX = 'ref: refs/heads/'
+# Placeholder branch in HEAD for repositories using the reftable backend, where
+# the real HEAD is stored in the reftable.
+HEAD_REFTABLE_BRANCH = '.invalid'
+
+# List of known CI environment variables for branch name
+CI_BRANCH_ENV_VARS = (
+    'GITHUB_HEAD_REF',                      # GitHub Actions
+    'CI_MERGE_REQUEST_SOURCE_BRANCH_NAME',  # GitLab CI
+    'BITBUCKET_BRANCH',                     # Bitbucket Pipelines
+)
+# The environment does not change during a run: look it up once, at import,
+# with a single lookup per variable. The first non-empty variable wins.
+_CI_BRANCH = next(filter(None, map(os.environ.get, CI_BRANCH_ENV_VARS)), '')
+
 
 def get_forge_branch() -> str:
     """
     Get the current branch name from CI environment variables. This function
     checks for known environment variables set at software forges in their CI
     systems. Focus is on the source branch of merge/pull requests as git will
-    often be in detached mode in that case.
+    often be in detached mode in that case. The variables are read once, when
+    the module is imported.
 
     Returns:
         The current branch name as a string, empty when not found
     """
+    return _CI_BRANCH
+
+
+def _find_git_dir() -> str:
+    """
+    Find the git directory for the current directory, without running git.
+    Honors GIT_DIR, then looks for .git in the current directory and its
+    parents. .git can be a file pointing to the git directory, as in worktrees
+    and submodules.
+
+    Returns:
+        The path to the git directory, empty when not found.
+    """
+    git_dir = os.environ.get('GIT_DIR')
+    if git_dir:
+        return git_dir
+
+    directory = os.getcwd()
+    while True:
+        dot_git = os.path.join(directory, '.git')
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            try:
+                with open(dot_git, encoding='utf-8') as f:
+                    line = f.readline().strip()
+            except OSError:
+                return ''
+            if line.startswith('gitdir: '):
+                return os.path.join(directory, line[len('gitdir: '):])
+            return ''
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return ''
+        directory = parent
+
+
+def _read_head_branch() -> str:
+    """
+    Get the current branch name by reading HEAD in the git directory. This
+    avoids running git in the common case of a HEAD attached to a local
+    branch.
+
+    Returns:
+        The branch name as a string, empty when HEAD is detached, cannot be
+        read, or is the placeholder of the reftable backend.
+    """
+    git_dir = _find_git_dir()
+    if not git_dir:
+        return ''
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), encoding='utf-8') as f:
+            head = f.readline().rstrip('\n')
+    except OSError:
+        return ''
+    if not head.startswith(HEAD_BRANCH_PREFIX):
+        return ''
+    branch_name = head[len(HEAD_BRANCH_PREFIX):]
+    if branch_name == HEAD_REFTABLE_BRANCH:
+        return ''
+    return branch_name
+
 
-    # List of known CI environment variables for branch name
-    ci_branch_env_vars = [
-        'GITHUB_HEAD_REF',                      # GitHub Actions
-        'CI_MERGE_REQUEST_SOURCE_BRANCH_NAME',  # GitLab CI
-        'BITBUCKET_BRANCH',                     # Bitbucket Pipelines
-    ]
-    for env_var in ci_branch_env_vars:
-        branch_name = os.environ.get(env_var)
-        if branch_name:
-            return branch_name
-    return ''
 def get_branch_name() -> str:
     """
     Get the current branch name, even in detached HEAD state.
@@ -46,19 +286,35 @@ def get_branch_name() -> str:
     Raises:
         RuntimeError: If the branch name cannot be determined.
     """
+    # Read HEAD directly when possible, git is only run for the edge cases.
+    branch_name = _read_head_branch()
+    if branch_name:
+        return branch_name
+
+    # subprocess is slow to import, only pay for it when git has to be run.
+    # git is started without closing inherited file descriptors, as this can
+    # be slow when the limit on open files is high.
+    import subprocess
+
     try:
-        # Try to get the branch name using symbolic-ref
+        # Try to get the branch name using symbolic-ref, which also works on
+        # unborn branches and fails when HEAD is detached.
         branch_name = subprocess.check_output(
-            ['git', 'symbolic-ref', '--short', 'HEAD'],
-            stderr=subprocess.DEVNULL
-        ).decode('utf-8').strip()
+            ['git', 'symbolic-ref', '--short', '-q', 'HEAD'],
+            encoding='utf-8',
+            stderr=subprocess.DEVNULL,
+            close_fds=False
+        ).rstrip('\n')
     except subprocess.CalledProcessError:
         # If symbolic-ref fails (e.g., detached HEAD), fall back to name-rev
+        ref_name = ''
         try:
             ref_name = subprocess.check_output(
                 ['git', 'name-rev', '--name-only', 'HEAD'],
-                stderr=subprocess.DEVNULL
-            ).decode('utf-8').strip()
+                encoding='utf-8',
+                stderr=subprocess.DEVNULL,
+                close_fds=False
+            ).rstrip('\n')
             if (ref_name.startswith('remotes/') or
                 ref_name.startswith('refs/')):
                 chunks = ref_name.split('/')
@@ -71,22 +327,16 @@ def get_branch_name() -> str:
     return branch_name
 
 
-def main(argv: Sequence[str] | None = None) -> int:
+def _build_parser() -> argparse.ArgumentParser:
     """
-    Main function for the branch_check script. Parses the command-line
-    arguments, then checks the name of the branch against the allowed/denied
-    patterns.  A branch name must match at least one of the allowed patterns
-    and must not match any of the denied patterns.
-
-    Args:
-      argv: A sequence of command-line arguments. If None, sys.argv[1:] will be
-      used.
+    Build the parser for the command-line arguments. argparse is slow to
+    import, so it is only imported when there are arguments to parse.
 
     Returns:
-      An integer representing the exit code. 0 indicates success, while non-zero
-      values indicate errors.
+      The argument parser.
     """
-    argv = argv if argv is not None else sys.argv[1:]
+    import argparse
+
     parser = argparse.ArgumentParser(
         prog='branch_check', description='Check branch name against allow/deny patterns')
 
@@ -103,11 +353,78 @@ def main(argv: Sequence[str] | None = None) -> int:
         action='append',
         help='Regular expression that branch name should not match, can be repeated.'
     )
+    return parser
+
 
-    # Parse the command-line arguments and pick good defaults
-    args = parser.parse_args(argv)
-    allow_patterns = args.allow or DEFAULT_ALLOWED_PATTERNS
-    deny_patterns = args.deny or DEFAULT_DENIED_PATTERNS
+def _run(branch_name: str, allow: Sequence[str] | None,
+         deny: Sequence[str] | None) -> int:
+    """
+    Check the name of the branch against the allowed/denied patterns.
+
+    Args:
+      branch_name: The name of the branch to check.
+      allow: Regular expressions that the branch name should match, None or
+      empty for the defaults.
+      deny: Regular expressions that the branch name should not match, None
+      or empty for the defaults.
+
+    Returns:
+      An integer representing the exit code. 0 indicates success, 1 that the
+      branch name is not valid.
+    """
+    # Pick good defaults. Patterns are compiled once, so matching does not go
+    # through the re module cache, and combined into as few matchers as
+    # possible. The original patterns are kept for error messages.
+    if allow:
+        allow_patterns = list(allow)
+        allow_matchers = _combine_patterns([_compile_pattern(p) for p in allow])
+    else:
+        allow_patterns = DEFAULT_ALLOWED_PATTERNS
+        allow_matchers = DEFAULT_ALLOWED_MATCHERS
+    if deny:
+        deny_patterns = list(deny)
+        deny_matchers = _combine_patterns([_compile_pattern(p) for p in deny])
+    else:
+        deny_patterns = DEFAULT_DENIED_PATTERNS
+        deny_matchers = DEFAULT_DENIED_MATCHERS
+
+    # Check if the branch name matches any of the allowed patterns
+    if not any(match(branch_name) for match in allow_matchers):
+        print(f'Branch name "{branch_name}" does not match any of the allowed patterns: {allow_patterns}')
+        return 1
+    # Check if the branch name matches any of the denied patterns
+    if any(match(branch_name) for match in deny_matchers):
+        print(f'Branch name "{branch_name}" matches a denied pattern: {deny_patterns}')
+        return 1
+    if not os.environ.get('PRE_COMMIT_QUIET'):
+        print(f'Branch name "{branch_name}" is valid.')
+    return 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """
+    Main function for the branch_check script. Parses the command-line
+    arguments, then checks the name of the branch against the allowed/denied
+    patterns.  A branch name must match at least one of the allowed patterns
+    and must not match any of the denied patterns.
+
+    Args:
+      argv: A sequence of command-line arguments. If None, sys.argv[1:] will be
+      used.
+
+    Returns:
+      An integer representing the exit code. 0 indicates success, while non-zero
+      values indicate errors.
+    """
+    argv = argv if argv is not None else sys.argv[1:]
+
+    # Without arguments, the defaults apply and there is nothing to parse.
+    allow: list[str] | None = None
+    deny: list[str] | None = None
+    if argv:
+        args = _build_parser().parse_args(argv)
+        allow = args.allow
+        deny = args.deny
 
     # Detect the current branch name
     try:
@@ -118,16 +435,7 @@ def main(argv: Sequence[str] | None = None) -> int:
         print(e)
         return 1
 
-    # Check if the branch name matches any of the allowed patterns
-    if not any(re.match(pattern, branch_name) for pattern in allow_patterns):
-        print(f'Branch name "{branch_name}" does not match any of the allowed patterns: {allow_patterns}')
-        return 1
-    # Check if the branch name matches any of the denied patterns
-    if any(re.match(pattern, branch_name) for pattern in deny_patterns):
-        print(f'Branch name "{branch_name}" matches a denied pattern: {deny_patterns}')
-        return 1
-    print(f'Branch name "{branch_name}" is valid.')
-    return 0
+    return _run(branch_name, allow, deny)
 
 
 if __name__ == '__main__':
@@ -1,5 +1,19 @@
 from __future__ import annotations
 
+import os
+
 from setuptools import setup
 
-setup()
+# Optionally compile the hook to a C extension with mypyc, which requires mypy
+# to be installed at build time. The pure Python module is used otherwise.
+ext_modules = []
+if os.environ.get('BRANCH_CHECK_USE_MYPYC') == '1':
+    try:
+        from mypyc.build import mypycify
+    except ImportError:
+        raise SystemExit(
+            'BRANCH_CHECK_USE_MYPYC=1 requires mypy at build time: install it, '
+            'then build with pip install --no-build-isolation .')
+    ext_modules = mypycify(['pre_commit_hooks/branch_check.py'])
+
+setup(ext_modules=ext_modules)
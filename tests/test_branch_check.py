@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from pre_commit_hooks import branch_check
+from pre_commit_hooks.branch_check import _combine_patterns
+from pre_commit_hooks.branch_check import _compile_default_patterns
+from pre_commit_hooks.branch_check import _compile_pattern
+from pre_commit_hooks.branch_check import DEFAULT_ALLOWED_MATCHERS
+from pre_commit_hooks.branch_check import DEFAULT_ALLOWED_PATTERNS
+
+PATTERNS = [
+    # Literal alternations, turned into set lookups
+    '^(main|master|develop)$',
+    '^main$',
+    r'^(main|release/v1\.0|hot-fix)$',
+    r'^release/1\.2$',
+    '^(ma.n)$',
+    '^main$\n',
+    '^/$\n',
+    '^(fix|main)$\n',
+    # Prefix patterns, and patterns that look like them
+    '^(feature|fix)/[a-z0-9/.-]*[a-z0-9]$',
+    '^(feature|fix)/x',
+    '^(feature|fix)/?foo$',
+    '^(feature|fix)/*x',
+    '^(feature|fix)/+x',
+    '^(feature|fix)/{0,1}x',
+    '^(feature|fix)/x|master',
+    '^(feature|fix)/x\n|main',
+    # Backreferences and conditionals
+    r'(\w)\1',
+    '^(x)?y$',
+    '^(a)?(?(1)b|c)$',
+    # Inline flags
+    '(?i)^wip/.*',
+    '^Tmp-.*',
+    '(?i:^ma)ster',
+    # Plain regular expressions
+    '^[0-9a-z_./-]+$',
+    'ma.*r$',
+    '^x',
+]
+
+PATTERN_SETS = [[pattern] for pattern in PATTERNS] + [
+    PATTERNS,
+    ['^(x)?y$', '^(a)?(?(1)b|c)$'],
+    ['(?i)^wip/.*', '^Tmp-.*'],
+    ['^a', '^b', r'(\w)\1'],
+    ['(?P<n>a)', '(?P<n>b)'],
+    ['^(main|master)$', '^main$', '^(feature|fix)/x', '^x', 'ma.*r$'],
+]
+
+NAMES = [
+    'main', 'master', 'develop', 'mainx', 'maXn', 'MASTER',
+    'release/v1.0', 'release/v1x0', 'release/1.2', 'release/1x2', 'hot-fix',
+    'feature/a', 'feature/a-', 'feature/', 'feature/x', 'featurex',
+    'featurefoo', 'feature/foo', 'fix//x', 'bugfix/a', 'chore/a.b/c',
+    'feature/é', 'ab', 'c', 'y', 'xy', 'aa', 'bb', 'b',
+    'WIP/a', 'wip/a', 'Tmp-x', 'tmp-x', 'x', 'feature/A', '', '/', 'fix',
+]
+
+
+# $ also matches before a trailing newline
+NEWLINE_NAMES = [f'{name}\n' for name in NAMES] + ['main\n\n']
+
+
+@pytest.mark.parametrize('patterns', PATTERN_SETS)
+@pytest.mark.parametrize('name', NAMES + NEWLINE_NAMES)
+def test_combine_patterns_matches_like_re(patterns, name):
+    matchers = _combine_patterns([_compile_pattern(p) for p in patterns])
+    expected = any(re.match(p, name) for p in patterns)
+    assert bool(any(match(name) for match in matchers)) is expected
+
+
+@pytest.mark.parametrize('name', NAMES + NEWLINE_NAMES)
+def test_default_matchers_match_like_re(name):
+    expected = any(re.match(p, name) for p in DEFAULT_ALLOWED_PATTERNS)
+    assert bool(any(match(name) for match in DEFAULT_ALLOWED_MATCHERS)) is expected
+
+
+@pytest.mark.parametrize(
+    ('head', 'expected'),
+    (
+        ('ref: refs/heads/feature/a\n', 'feature/a'),
+        ('ref: refs/heads/.invalid\n', ''),
+        ('0123456789abcdef0123456789abcdef01234567\n', ''),
+    ),
+)
+def test_read_head_branch(tmp_path, monkeypatch, head, expected):
+    (tmp_path / '.git').mkdir()
+    (tmp_path / '.git' / 'HEAD').write_text(head)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('GIT_DIR', raising=False)
+    assert branch_check._read_head_branch() == expected
+
+
+def _git(cwd, *args):
+    subprocess.run(
+        ('git', '-c', 'user.name=test', '-c', 'user.email=test@example.com',
+         *args),
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    _git(tmp_path, 'init', '-q', '-b', 'feature/unborn')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('GIT_DIR', raising=False)
+    # Force the git fallback, as when HEAD cannot be read directly.
+    monkeypatch.setattr(branch_check, '_read_head_branch', lambda: '')
+    return tmp_path
+
+
+def test_get_branch_name_unborn(git_repo):
+    assert branch_check.get_branch_name() == 'feature/unborn'
+
+
+def test_get_branch_name_detached(git_repo):
+    _git(git_repo, 'commit', '-q', '--allow-empty', '-m', 'initial')
+    _git(git_repo, 'update-ref', 'refs/remotes/origin/feature/a', 'HEAD')
+    _git(git_repo, 'checkout', '-q', '--detach')
+    _git(git_repo, 'branch', '-q', '-D', 'feature/unborn')
+    assert branch_check.get_branch_name() == 'feature/a'
+
+
+DEFAULT_LIKE_PATTERNS = [
+    '^(main|master|develop)$',
+    '^main$',
+    '^(main)$',
+    '^(feature|fix)/[a-z0-9/.-]*[a-z0-9]$',
+    '^(ma.n)$',
+    '^(a)(b)$',
+    '^[a-z]+-[0-9]+$',
+]
+
+
+@pytest.mark.parametrize('name', NAMES + NEWLINE_NAMES)
+def test_compile_default_patterns_matches_like_re(name):
+    matchers = _compile_default_patterns(DEFAULT_LIKE_PATTERNS)
+    expected = any(re.match(p, name) for p in DEFAULT_LIKE_PATTERNS)
+    assert bool(any(match(name) for match in matchers)) is expected
+
+
+@pytest.mark.parametrize(
+    ('quiet', 'expected'),
+    (
+        (None, 'Branch name "main" is valid.\n'),
+        ('', 'Branch name "main" is valid.\n'),
+        ('1', ''),
+    ),
+)
+def test_run_quiet(capsys, monkeypatch, quiet, expected):
+    if quiet is None:
+        monkeypatch.delenv('PRE_COMMIT_QUIET', raising=False)
+    else:
+        monkeypatch.setenv('PRE_COMMIT_QUIET', quiet)
+    assert branch_check._run('main', None, None) == 0
+    assert capsys.readouterr().out == expected
+
+
+def test_run_quiet_still_reports_errors(capsys, monkeypatch):
+    monkeypatch.setenv('PRE_COMMIT_QUIET', '1')
+    assert branch_check._run('wip', None, None) == 1
+    assert 'does not match any of the allowed patterns' in capsys.readouterr().out
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(code, cwd=ROOT, **env):
+    """Run code in a fresh interpreter, as the CI variables are read at import."""
+    environ = {
+        k: v for k, v in os.environ.items()
+        if k not in branch_check.CI_BRANCH_ENV_VARS
+        and k not in ('GIT_DIR', 'PRE_COMMIT_QUIET')
+    }
+    environ.update(env, PYTHONPATH=ROOT)
+    return subprocess.run(
+        (sys.executable, '-c', code),
+        cwd=cwd, env=environ, check=True, capture_output=True, text=True,
+    ).stdout
+
+
+FORGE_BRANCH = (
+    'from pre_commit_hooks.branch_check import get_forge_branch\n'
+    'print(get_forge_branch())'
+)
+
+
+@pytest.mark.parametrize(
+    ('env', 'expected'),
+    (
+        ({}, ''),
+        ({'BITBUCKET_BRANCH': 'c'}, 'c'),
+        ({'CI_MERGE_REQUEST_SOURCE_BRANCH_NAME': 'b', 'BITBUCKET_BRANCH': 'c'}, 'b'),
+        ({'GITHUB_HEAD_REF': 'a', 'CI_MERGE_REQUEST_SOURCE_BRANCH_NAME': 'b'}, 'a'),
+    ),
+)
+def test_get_forge_branch(env, expected):
+    assert _python(FORGE_BRANCH, **env) == f'{expected}\n'
+
+
+@pytest.mark.parametrize(
+    ('env', 'expected'),
+    (
+        ({'GITHUB_HEAD_REF': ''}, ''),
+        ({'GITHUB_HEAD_REF': '', 'BITBUCKET_BRANCH': 'c'}, 'c'),
+        ({'GITHUB_HEAD_REF': '', 'CI_MERGE_REQUEST_SOURCE_BRANCH_NAME': '',
+          'BITBUCKET_BRANCH': 'c'}, 'c'),
+    ),
+)
+def test_get_forge_branch_skips_empty(env, expected):
+    assert _python(FORGE_BRANCH, **env) == f'{expected}\n'
+
+
+@pytest.fixture
+def no_git_dir_env(monkeypatch):
+    monkeypatch.delenv('GIT_DIR', raising=False)
+
+
+def test_find_git_dir_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GIT_DIR', '/elsewhere/.git')
+    assert branch_check._find_git_dir() == '/elsewhere/.git'
+
+
+def test_find_git_dir_parents(tmp_path, monkeypatch, no_git_dir_env):
+    (tmp_path / '.git').mkdir()
+    (tmp_path / 'a' / 'b').mkdir(parents=True)
+    monkeypatch.chdir(tmp_path / 'a' / 'b')
+    assert branch_check._find_git_dir() == str(tmp_path / '.git')
+
+
+def test_find_git_dir_gitdir_file(tmp_path, monkeypatch, no_git_dir_env):
+    (tmp_path / 'worktree').mkdir()
+    (tmp_path / 'worktree' / '.git').write_text('gitdir: ../repo/.git/worktrees/wt\n')
+    monkeypatch.chdir(tmp_path / 'worktree')
+    git_dir = branch_check._find_git_dir()
+    assert os.path.normpath(git_dir) == str(tmp_path / 'repo' / '.git' / 'worktrees' / 'wt')
+
+
+def test_find_git_dir_invalid_file(tmp_path, monkeypatch, no_git_dir_env):
+    (tmp_path / '.git').write_text('not a gitdir\n')
+    monkeypatch.chdir(tmp_path)
+    assert branch_check._find_git_dir() == ''
+
+
+def test_main_without_arguments_imports(tmp_path):
+    (tmp_path / '.git').mkdir()
+    (tmp_path / '.git' / 'HEAD').write_text('ref: refs/heads/main\n')
+    code = (
+        'import sys\n'
+        'from pre_commit_hooks.branch_check import main\n'
+        'assert main([]) == 0\n'
+        "print('argparse' in sys.modules, 'subprocess' in sys.modules)"
+    )
+    assert _python(code, cwd=tmp_path, PRE_COMMIT_QUIET='1') == 'False False\n'
+
+
+@pytest.mark.parametrize(
+    ('branch_name', 'argv', 'expected'),
+    (
+        ('main', [], 0),
+        ('feature/a', [], 0),
+        ('wip', [], 1),
+        ('main', ['--deny', '^(main|master)$'], 1),
+        ('feature/a', ['--deny', '^(main|master)$'], 0),
+        ('WIP-1', ['-a', '^[A-Z]+-[0-9]+$'], 0),
+        ('main', ['-a', '^[A-Z]+-[0-9]+$'], 1),
+        ('feature/a', ['-a', '^x', '-a', '^feature/', '-d', '^feature/b'], 0),
+        ('feature/b', ['-a', '^x', '-a', '^feature/', '-d', '^feature/b'], 1),
+    ),
+)
+def test_main(monkeypatch, branch_name, argv, expected):
+    monkeypatch.setattr(branch_check, '_CI_BRANCH', branch_name)
+    assert branch_check.main(argv) == expected
+
+
+def test_main_reads_head(tmp_path, monkeypatch, capsys):
+    (tmp_path / '.git').mkdir()
+    (tmp_path / '.git' / 'HEAD').write_text('ref: refs/heads/feature/a\n')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('GIT_DIR', raising=False)
+    monkeypatch.delenv('PRE_COMMIT_QUIET', raising=False)
+    monkeypatch.setattr(branch_check, '_CI_BRANCH', '')
+    assert branch_check.main([]) == 0
+    assert capsys.readouterr().out == 'Branch name "feature/a" is valid.\n'
+
+
+def test_main_branch_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GIT_DIR', str(tmp_path / 'missing'))
+    monkeypatch.setattr(branch_check, '_CI_BRANCH', '')
+    assert branch_check.main([]) == 1
+    assert 'failed to determine the branch name' in capsys.readouterr().out